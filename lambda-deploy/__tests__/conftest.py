@@ -0,0 +1,31 @@
+"""
+Shared pytest configuration for Profile Lambda tests
+Sets environment variables and imports the handler once per test session
+"""
+import os
+import sys
+
+from hypothesis import HealthCheck, settings
+from hypothesis.database import DirectoryBasedExampleDatabase
+
+# Keep the property suite small and replay previously failing/shrunk examples from
+# the on-disk database instead of rediscovering them on every run
+settings.register_profile(
+    'ci',
+    max_examples=30,
+    deadline=None,
+    database=DirectoryBasedExampleDatabase('.hypothesis/examples'),
+    suppress_health_check=[HealthCheck.function_scoped_fixture]
+)
+settings.register_profile('thorough', parent=settings.get_profile('ci'), max_examples=200)
+settings.load_profile(os.environ.get('HYPOTHESIS_PROFILE', 'ci'))
+
+
+def pytest_configure(config):
+    """Prepare the environment and import profile_handler before test modules are collected"""
+    os.environ.setdefault('DYNAMODB_USERS_TABLE', 'Users')
+    os.environ.setdefault('S3_BUCKET_NAME', 'polizalab-documents-dev')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import profile_handler  # noqa: F401
@@ -0,0 +1,45 @@
+"""
+In-memory DynamoDB client fake shared by the Lambda handler unit tests
+"""
+
+
+class FakeDynamoDBClient:
+    """Minimal stand-in for the low-level DynamoDB client used by the Lambda handlers"""
+    
+    def __init__(self):
+        self.get_item_return = {}
+        self.get_item_side_effect = None
+        self.update_item_return = {}
+        self.update_item_side_effect = None
+        self.put_item_return = {}
+        self.put_item_side_effect = None
+        self.calls = []
+        self._side_effect_idx = {}
+    
+    def _respond(self, method_name, kwargs, return_value, side_effect):
+        """Resolve a call: raise an exception, delegate to a callable, or step through a list of responses"""
+        if side_effect is None:
+            return return_value
+        if isinstance(side_effect, Exception):
+            raise side_effect
+        if callable(side_effect):
+            return side_effect(**kwargs)
+        idx = self._side_effect_idx.get(method_name, 0)
+        self._side_effect_idx[method_name] = idx + 1
+        return side_effect[idx]
+    
+    def get_item(self, **kwargs):
+        self.calls.append(('get_item', kwargs))
+        return self._respond('get_item', kwargs, self.get_item_return, self.get_item_side_effect)
+    
+    def update_item(self, **kwargs):
+        self.calls.append(('update_item', kwargs))
+        return self._respond('update_item', kwargs, self.update_item_return, self.update_item_side_effect)
+    
+    def put_item(self, **kwargs):
+        self.calls.append(('put_item', kwargs))
+        return self._respond('put_item', kwargs, self.put_item_return, self.put_item_side_effect)
+    
+    def calls_to(self, method_name):
+        """Return the kwargs of every call made to method_name, in order"""
+        return [kwargs for name, kwargs in self.calls if name == method_name]
@@ -0,0 +1,154 @@
+"""
+Unit tests for Auth Lambda Handler
+Tests POST /auth/register validation, successful registration and duplicate handling
+"""
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+import auth_handler
+from fake_dynamodb import FakeDynamoDBClient
+
+pytestmark = pytest.mark.fast
+
+
+# Request bodies reused by the validation tests
+_VALID_BODY = json.dumps({'cognitoUserId': 'cognito-123', 'email': 'user@example.com'})
+_OVERSIZED_BODY = json.dumps({
+    'cognitoUserId': 'cognito-123',
+    'email': 'user@example.com',
+    'padding': 'x' * auth_handler.MAX_REGISTER_BODY_LENGTH
+})
+_BODY_WITHOUT_KEY = json.dumps({'email': 'user@example.com'})
+_MALFORMED_JSON = '{"cognitoUserId": "cognito-123", "email": '
+_INVALID_EMAIL_BODY = json.dumps({'cognitoUserId': 'cognito-123', 'email': 'not-an-email'})
+
+
+def condition_failed_with(stored_item):
+    """put_item side effect failing the duplicate guard, returning stored_item (or the sent Item) as ALL_OLD"""
+    def put_item(**kwargs):
+        item = kwargs['Item'] if stored_item is None else stored_item
+        raise ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'},
+             'Item': item},
+            'PutItem'
+        )
+    return put_item
+
+
+def make_event(body=None, method='POST', path='/auth/register', origin=None):
+    """Build a fresh API Gateway HTTP API v2 event with per-test overrides"""
+    event = {
+        'requestContext': {'http': {'method': method, 'path': path}},
+        'headers': {'origin': origin} if origin is not None else {}
+    }
+    if body is not None:
+        event['body'] = body
+    return event
+
+
+def body_of(response):
+    """Parse the JSON body of a Lambda proxy response"""
+    return json.loads(response['body'])
+
+
+@pytest.fixture(autouse=True)
+def fake_dynamodb(monkeypatch):
+    """Replace the lazily created DynamoDB client with a fresh FakeDynamoDBClient per test"""
+    client = FakeDynamoDBClient()
+    monkeypatch.setattr('auth_handler._dynamodb', client)
+    return client
+
+
+class TestAuthHandlerValidation:
+    """Test POST /auth/register rejects bad payloads before writing"""
+
+    @pytest.mark.parametrize('body,expected_code', [
+        (_OVERSIZED_BODY, 'VALIDATION_ERROR'),
+        (_BODY_WITHOUT_KEY, 'VALIDATION_ERROR'),
+        (_MALFORMED_JSON, 'INVALID_JSON'),
+        (_INVALID_EMAIL_BODY, 'VALIDATION_ERROR'),
+        ('', 'VALIDATION_ERROR'),
+    ], ids=['oversized', 'missing-key', 'malformed-json', 'invalid-email', 'empty'])
+    def test_register_rejects_invalid_body(self, fake_dynamodb, body, expected_code):
+        """Test that invalid registration bodies return 400 without touching DynamoDB"""
+        # Arrange
+        event = make_event(body=body)
+
+        # Act
+        response = auth_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 400
+        assert body_of(response)['error']['code'] == expected_code
+        assert fake_dynamodb.calls_to('put_item') == []
+
+    def test_malformed_json_without_key_fails_the_raw_precheck(self, fake_dynamodb):
+        """Test that junk without cognitoUserId is rejected as a validation error before parsing"""
+        # Arrange
+        event = make_event(body='not json')
+
+        # Act
+        response = auth_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 400
+        assert body_of(response)['error']['code'] == 'VALIDATION_ERROR'
+
+
+class TestAuthHandlerRegister:
+    """Test POST /auth/register writes the user record"""
+
+    def test_register_valid_body_returns_201(self, fake_dynamodb):
+        """Test that a valid registration creates the record with a duplicate guard"""
+        # Arrange
+        event = make_event(body=_VALID_BODY, origin='https://crm.antesdefirmar.org')
+
+        # Act
+        response = auth_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 201
+        assert body_of(response) == {'success': True, 'userId': 'cognito-123'}
+        assert response['headers']['Access-Control-Allow-Origin'] == 'https://crm.antesdefirmar.org'
+        put = fake_dynamodb.calls_to('put_item')[0]
+        assert put['TableName'] == auth_handler.table_name
+        assert put['ConditionExpression'] == 'attribute_not_exists(userId)'
+        assert put['Item']['userId'] == {'S': 'cognito-123'}
+        assert put['Item']['email'] == {'S': 'user@example.com'}
+
+    def test_register_retried_own_write_returns_201(self, fake_dynamodb):
+        """Test that a failed guard returning the exact record we sent is treated as our committed retry"""
+        # Arrange
+        fake_dynamodb.put_item_side_effect = condition_failed_with(None)
+        event = make_event(body=_VALID_BODY)
+
+        # Act
+        response = auth_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 201
+        assert body_of(response)['userId'] == 'cognito-123'
+        put = fake_dynamodb.calls_to('put_item')[0]
+        assert put['ReturnValuesOnConditionCheckFailure'] == 'ALL_OLD'
+
+    def test_register_existing_user_returns_409(self, fake_dynamodb):
+        """Test that a failed guard returning a different stored record is reported as a duplicate"""
+        # Arrange
+        fake_dynamodb.put_item_side_effect = condition_failed_with({
+            'userId': {'S': 'cognito-123'},
+            'email': {'S': 'user@example.com'},
+            'nombre': {'S': 'Registrado'},
+            'apellido': {'NULL': True},
+            'profileImage': {'NULL': True},
+            'createdAt': {'S': '2024-01-01T00:00:00.000000Z'}
+        })
+        event = make_event(body=_VALID_BODY)
+
+        # Act
+        response = auth_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 409
+        assert body_of(response)['error']['code'] == 'USER_EXISTS'
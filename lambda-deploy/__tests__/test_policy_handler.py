@@ -0,0 +1,142 @@
+"""
+Unit tests for Policy Lambda Handler
+Tests PUT /policies/:id ownership checks and renewal-date updates
+"""
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+import policy_handler
+from fake_dynamodb import FakeDynamoDBClient
+
+pytestmark = pytest.mark.fast
+
+
+def make_event(user_id='owner-user', policy_id='policy-1', body=None):
+    """Build a fresh REST API PUT /policies/{id} event with per-test overrides"""
+    return {
+        'httpMethod': 'PUT',
+        'path': f'/policies/{policy_id}',
+        'pathParameters': {'id': policy_id},
+        'headers': {},
+        'requestContext': {'authorizer': {'jwt': {'claims': {'sub': user_id}}}},
+        'body': json.dumps(body or {})
+    }
+
+
+def condition_failed(old_item=None):
+    """ClientError for a failed ownership condition, carrying old_item as ALL_OLD when the policy exists"""
+    response = {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}}
+    if old_item is not None:
+        response['Item'] = old_item
+    return ClientError(response, 'UpdateItem')
+
+
+def body_of(response):
+    """Parse the JSON body of a Lambda proxy response"""
+    return json.loads(response['body'])
+
+
+@pytest.fixture(autouse=True)
+def fake_table(monkeypatch):
+    """Replace the Policies table resource with a fresh FakeDynamoDBClient per test"""
+    table = FakeDynamoDBClient()
+    monkeypatch.setattr('policy_handler.policies_table', table)
+    return table
+
+
+class TestUpdatePolicyOwnership:
+    """Test that PUT /policies/:id authorizes through the conditional write"""
+
+    def test_owner_update_returns_200(self, fake_table):
+        """Test that the owner's update is written in one conditional UpdateItem"""
+        # Arrange
+        fake_table.update_item_return = {'Attributes': {
+            'policyId': 'policy-1',
+            'userId': 'owner-user',
+            'clienteNombre': 'Carlos'
+        }}
+        event = make_event(body={'clienteNombre': 'Carlos'})
+
+        # Act
+        response = policy_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 200
+        body = body_of(response)
+        assert body['success'] is True
+        assert body['policy']['clienteNombre'] == 'Carlos'
+        assert fake_table.calls_to('get_item') == []
+        update = fake_table.calls_to('update_item')[0]
+        assert update['Key'] == {'policyId': 'policy-1'}
+        assert update['ConditionExpression'] == 'attribute_exists(policyId) AND userId = :userId'
+        assert update['ExpressionAttributeValues'][':userId'] == 'owner-user'
+        assert update['ExpressionAttributeValues'][':clienteNombre'] == 'Carlos'
+
+    def test_foreign_user_update_returns_403(self, fake_table):
+        """Test that a failed condition with an existing item is reported as forbidden"""
+        # Arrange
+        fake_table.update_item_side_effect = condition_failed({'policyId': 'policy-1', 'userId': 'owner-user'})
+        event = make_event(user_id='intruder-user', body={'clienteNombre': 'Carlos'})
+
+        # Act
+        response = policy_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 403
+        assert body_of(response) == {'error': 'Forbidden'}
+
+    def test_missing_policy_update_returns_404(self, fake_table):
+        """Test that a failed condition without an existing item is reported as not found"""
+        # Arrange
+        fake_table.update_item_side_effect = condition_failed()
+        event = make_event(policy_id='missing-policy', body={'clienteNombre': 'Carlos'})
+
+        # Act
+        response = policy_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 404
+        assert body_of(response) == {'error': 'Policy not found'}
+
+
+class TestUpdatePolicyRenewalDate:
+    """Test that fechaRenovacion never reaches the renewals index as null"""
+
+    def test_policy_without_renewal_removes_fecha_renovacion(self, fake_table):
+        """Test that a type with no renewal date REMOVEs fechaRenovacion instead of SETting null"""
+        # Arrange
+        fake_table.update_item_return = {'Attributes': {
+            'policyId': 'policy-1',
+            'userId': 'owner-user',
+            'tipoPoliza': 'Vida permanente',
+            'fechaInicio': '2024-01-01'
+        }}
+        event = make_event(body={'tipoPoliza': 'Vida permanente', 'fechaInicio': '2024-01-01'})
+
+        # Act
+        response = policy_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 200
+        update = fake_table.calls_to('update_item')[0]
+        assert update['UpdateExpression'].endswith(' REMOVE fechaRenovacion')
+        assert 'fechaRenovacion =' not in update['UpdateExpression']
+        assert ':fechaRenovacion' not in update['ExpressionAttributeValues']
+        assert update['ExpressionAttributeValues'][':renewalStatus'] == 'NOT_URGENT'
+
+    def test_policy_with_renewal_sets_fecha_renovacion(self, fake_table):
+        """Test that a computed renewal date is SET rather than removed"""
+        # Arrange
+        fake_table.update_item_return = {'Attributes': {'policyId': 'policy-1', 'userId': 'owner-user'}}
+        event = make_event(body={'tipoPoliza': 'Auto', 'fechaInicio': '2024-01-01'})
+
+        # Act
+        response = policy_handler.lambda_handler(event, None)
+
+        # Assert
+        assert response['statusCode'] == 200
+        update = fake_table.calls_to('update_item')[0]
+        assert 'REMOVE' not in update['UpdateExpression']
+        assert update['ExpressionAttributeValues'][':fechaRenovacion'] == '2025-01-01'
@@ -4,26 +4,113 @@ Tests GET existing profile, GET non-existent profile creates default, and error
 Requirements: 9.1, 9.4, 9.5
 """
 import json
-import os
+from unittest.mock import MagicMock
+import fastjsonschema
 import pytest
-from unittest.mock import Mock, patch, MagicMock
 from botocore.exceptions import ClientError
 
-# Set environment variables before importing handler
-os.environ['DYNAMODB_USERS_TABLE'] = 'Users'
-os.environ['S3_BUCKET_NAME'] = 'polizalab-documents-dev'
+import profile_handler
+from fake_dynamodb import FakeDynamoDBClient
 
-# Import after setting environment variables
-import sys
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from profile_handler import lambda_handler, handle_get_profile, handle_update_profile
+# msgspec parses response bodies in C; fall back to stdlib json when it is not installed
+try:
+    from msgspec.json import decode as _decode
+except ImportError:
+    _decode = json.loads
+
+pytestmark = pytest.mark.fast
+
+
+# Request bodies reused by the PUT validation tests
+_PUT_BODY_MISSING = json.dumps({'phone': '555-0100'})  # No updatable field (nombre, apellido, profileImageKey)
+_INVALID_JSON = 'invalid json'
+
+# DynamoDB errors shared by the error-path tests
+_DDB_ERR = ClientError({'Error': {'Code': 'InternalServerError', 'Message': 'DynamoDB error'}}, 'GetItem')
+
+# Shape-only response validators; per-test scalar values are still asserted separately
+_PROFILE_FIELDS = ['userId', 'email', 'nombre', 'apellido', 'phone', 'company']
+_validate_profile = fastjsonschema.compile({
+    'type': 'object',
+    'required': _PROFILE_FIELDS,
+    'properties': {field: {'type': ['string', 'null']} for field in _PROFILE_FIELDS}
+})
+_validate_error = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['error'],
+    'properties': {
+        'error': {
+            'type': 'object',
+            'required': ['code', 'message'],
+            'properties': {
+                'code': {'type': 'string'},
+                'message': {'type': 'string'}
+            }
+        }
+    }
+})
+
+
+def make_event(sub=None, email=None, name=None, method='GET', path='/profile', origin=None, body=None):
+    """Build a fresh API Gateway HTTP API v2 event with per-test overrides"""
+    claims = {}
+    if sub is not None:
+        claims['sub'] = sub
+    if email is not None:
+        claims['email'] = email
+    if name is not None:
+        claims['name'] = name
+    
+    event = {
+        'requestContext': {
+            'http': {'method': method, 'path': path},
+            'authorizer': {'jwt': {'claims': claims}}
+        },
+        'headers': {'origin': origin} if origin is not None else {}
+    }
+    if body is not None:
+        event['body'] = body
+    return event
+
+
+def marshal(item):
+    """Convert a plain profile dict into the AttributeValue form returned by the client"""
+    return profile_handler.to_attribute_values(item)
+
+
+def body_of(response):
+    """Parse the JSON body of a Lambda proxy response"""
+    return _decode(response['body'])
+
+
+def default_profile_update(stored=None):
+    """Emulate the if_not_exists default-profile UpdateItem against an optionally stored item"""
+    def update_item(**kwargs):
+        values = kwargs['ExpressionAttributeValues']
+        defaults = {
+            'email': values[':email'],
+            'nombre': values[':nombre'],
+            'apellido': values[':empty'],
+            'phone': values[':empty'],
+            'company': values[':empty'],
+            'createdAt': values[':createdAt']
+        }
+        return {'Attributes': {**kwargs['Key'], **defaults, **(stored or {})}}
+    return update_item
+
+
+@pytest.fixture(autouse=True)
+def fake_dynamodb(monkeypatch):
+    """Replace the module-level DynamoDB client with a fresh FakeDynamoDBClient per test"""
+    client = FakeDynamoDBClient()
+    monkeypatch.setattr('profile_handler.dynamodb', client)
+    return client
 
 
 class TestProfileHandlerGetExisting:
     """Test GET request for existing profile"""
     
-    @patch('profile_handler.users_table')
-    def test_get_existing_profile_returns_200(self, mock_table):
+    def test_get_existing_profile_returns_200(self, fake_dynamodb):
         """Test that GET request for existing profile returns 200 with profile data"""
         # Arrange
         user_id = 'test-user-123'
@@ -36,42 +123,24 @@ class TestProfileHandlerGetExisting:
             'company': 'Test Company'
         }
         
-        mock_table.get_item.return_value = {'Item': existing_profile}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': 'test@example.com',
-                            'name': 'Test User'
-                        }
-                    }
-                }
-            },
-            'headers': {
-                'origin': 'https://crm.antesdefirmar.org'
-            }
-        }
+        fake_dynamodb.get_item_return = {'Item': marshal(existing_profile)}
+        
+        event = make_event(sub=user_id, email='test@example.com', name='Test User',
+                           origin='https://crm.antesdefirmar.org')
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_profile(body)
         assert body['userId'] == user_id
         assert body['email'] == 'test@example.com'
         assert body['nombre'] == 'Test'
-        mock_table.get_item.assert_called_once_with(Key={'userId': user_id})
+        assert fake_dynamodb.calls == [('get_item', {'TableName': 'Users', 'Key': {'userId': {'S': user_id}}})]
     
-    @patch('profile_handler.users_table')
-    def test_get_existing_profile_handles_none_values(self, mock_table):
+    def test_get_existing_profile_handles_none_values(self, fake_dynamodb):
         """Test that None values in profile are properly serialized"""
         # Arrange
         user_id = 'test-user-456'
@@ -84,78 +153,74 @@ class TestProfileHandlerGetExisting:
             'company': None
         }
         
-        mock_table.get_item.return_value = {'Item': existing_profile}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': 'test@example.com'
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        fake_dynamodb.get_item_return = {'Item': marshal(existing_profile)}
+        
+        event = make_event(sub=user_id, email='test@example.com')
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_profile(body)
         assert body['apellido'] is None
         assert body['phone'] is None
 
 
+    def test_profile_image_url_is_reused_while_fresh(self, fake_dynamodb, monkeypatch):
+        """Test that warm GETs reuse the cached presigned image URL instead of signing again"""
+        # Arrange
+        user_id = 'image-user'
+        fake_dynamodb.get_item_return = {'Item': marshal({
+            'userId': user_id,
+            'email': 'image@example.com',
+            'nombre': 'Image',
+            'apellido': 'User',
+            'phone': '',
+            'company': '',
+            'profileImageKey': f'profiles/{user_id}/avatar.png'
+        })}
+        s3_client = MagicMock()
+        s3_client.generate_presigned_url.return_value = 'https://signed.example/avatar.png'
+        monkeypatch.setattr(profile_handler, 'get_s3_client', lambda: s3_client)
+        monkeypatch.setattr(profile_handler, '_image_url_cache', {})
+        
+        event = make_event(sub=user_id, email='image@example.com')
+        
+        # Act
+        first = profile_handler.lambda_handler(event, None)
+        second = profile_handler.lambda_handler(event, None)
+        
+        # Assert
+        assert body_of(first)['profileImageUrl'] == 'https://signed.example/avatar.png'
+        assert body_of(second)['profileImageUrl'] == 'https://signed.example/avatar.png'
+        assert s3_client.generate_presigned_url.call_count == 1
+
+
 class TestProfileHandlerGetNonExistent:
     """Test GET request for non-existent profile creates default"""
     
-    @patch('profile_handler.users_table')
-    def test_get_nonexistent_profile_creates_default(self, mock_table):
+    def test_get_nonexistent_profile_creates_default(self, fake_dynamodb):
         """Test that GET request for non-existent profile creates default profile (Requirement 9.1)"""
         # Arrange
         user_id = 'new-user-789'
         email = 'newuser@example.com'
         name = 'New User'
         
-        # First get_item returns no profile
-        mock_table.get_item.return_value = {}
-        
-        # put_item succeeds (no concurrent creation)
-        mock_table.put_item.return_value = {}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': name
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        # get_item returns no profile, so the defaults are written
+        fake_dynamodb.get_item_return = {}
+        fake_dynamodb.update_item_side_effect = default_profile_update()
+        
+        event = make_event(sub=user_id, email=email, name=name)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_profile(body)
         assert body['userId'] == user_id
         assert body['email'] == email
         assert body['nombre'] == name
@@ -163,142 +228,72 @@ class TestProfileHandlerGetNonExistent:
         assert body['phone'] == ''
         assert body['company'] == ''
         
-        # Verify put_item was called with correct parameters
-        mock_table.put_item.assert_called_once()
-        call_args = mock_table.put_item.call_args
-        assert call_args[1]['Item']['userId'] == user_id
-        assert call_args[1]['ConditionExpression'] == 'attribute_not_exists(userId)'
+        # Verify update_item was called with correct parameters
+        update_calls = fake_dynamodb.calls_to('update_item')
+        assert len(update_calls) == 1
+        assert update_calls[0]['Key'] == {'userId': {'S': user_id}}
+        assert update_calls[0]['UpdateExpression'] == profile_handler.DEFAULT_PROFILE_UPDATE_EXPRESSION
+        assert update_calls[0]['ReturnValues'] == 'ALL_NEW'
     
-    @patch('profile_handler.users_table')
-    def test_get_nonexistent_profile_extracts_email_from_token(self, mock_table):
-        """Test that email is extracted from Cognito JWT token (Requirement 9.4)"""
+    @pytest.mark.parametrize('name,expected_nombre', [
+        ('Token User', 'Token User'),
+        (None, 'extracted@example.com'),  # Should use email as fallback
+    ])
+    def test_get_nonexistent_profile_extracts_claims_from_token(self, fake_dynamodb, name, expected_nombre):
+        """Test that email and name are extracted from Cognito JWT token, with email as name fallback (Requirement 9.4)"""
         # Arrange
         user_id = 'user-email-test'
         email = 'extracted@example.com'
         
-        mock_table.get_item.return_value = {}
-        mock_table.put_item.return_value = {}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
-        
-        # Act
-        response = lambda_handler(event, None)
+        fake_dynamodb.get_item_return = {}
+        fake_dynamodb.update_item_side_effect = default_profile_update()
         
-        # Assert
-        assert response['statusCode'] == 200
-        body = json.loads(response['body'])
-        assert body['email'] == email
-    
-    @patch('profile_handler.users_table')
-    def test_get_nonexistent_profile_uses_email_as_name_fallback(self, mock_table):
-        """Test that email is used as name fallback when name claim is missing (Requirement 9.4)"""
-        # Arrange
-        user_id = 'user-no-name'
-        email = 'fallback@example.com'
-        
-        mock_table.get_item.return_value = {}
-        mock_table.put_item.return_value = {}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email
-                            # No 'name' claim
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        event = make_event(sub=user_id, email=email, name=name)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
-        body = json.loads(response['body'])
-        assert body['nombre'] == email  # Should use email as fallback
+        body = body_of(response)
+        _validate_profile(body)
+        assert body['email'] == email
+        assert body['nombre'] == expected_nombre
     
-    @patch('profile_handler.users_table')
-    def test_concurrent_profile_creation_handles_race_condition(self, mock_table):
-        """Test that concurrent profile creation is handled gracefully (Requirement 9.3)"""
+    def test_concurrent_profile_creation_handles_race_condition(self, fake_dynamodb):
+        """Test that a profile created by a concurrent request is returned, not overwritten (Requirement 9.3)"""
         # Arrange
         user_id = 'concurrent-user'
         email = 'concurrent@example.com'
         
-        # First get_item returns no profile
-        # Second get_item (after ConditionalCheckFailedException) returns existing profile
+        # get_item misses, but another request stores the profile before our update lands
         existing_profile = {
             'userId': user_id,
             'email': email,
-            'nombre': 'Concurrent User',
+            'nombre': 'Winner',
             'apellido': 'Test',
             'phone': '',
             'company': ''
         }
+        fake_dynamodb.get_item_return = {}
+        fake_dynamodb.update_item_side_effect = default_profile_update(marshal(existing_profile))
         
-        mock_table.get_item.side_effect = [
-            {},  # First call: no profile
-            {'Item': existing_profile}  # Second call: profile exists
-        ]
-        
-        # put_item raises ConditionalCheckFailedException (profile created by another request)
-        error_response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
-        mock_table.put_item.side_effect = ClientError(error_response, 'PutItem')
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': 'Concurrent User'
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        event = make_event(sub=user_id, email=email, name='Loser')
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_profile(body)
         assert body['userId'] == user_id
-        assert body['email'] == email
+        assert body['nombre'] == 'Winner'
+        assert body['apellido'] == 'Test'
         
-        # Verify get_item was called twice (once initially, once after ConditionalCheckFailedException)
-        assert mock_table.get_item.call_count == 2
+        # One read and one write, with no re-read after the write
+        assert len(fake_dynamodb.calls_to('get_item')) == 1
+        assert len(fake_dynamodb.calls_to('update_item')) == 1
 
 
 class TestProfileHandlerErrorHandling:
@@ -306,83 +301,44 @@ class TestProfileHandlerErrorHandling:
     
     def test_missing_authorization_returns_401(self):
         """Test that missing authorization returns 401 (Requirement 9.5)"""
-        # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {}  # No 'sub' claim
-                    }
-                }
-            },
-            'headers': {}
-        }
+        # Arrange: no 'sub' claim
+        event = make_event()
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 401
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_error(body)
         assert body['error']['code'] == 'AUTH_REQUIRED'
     
-    @patch('profile_handler.users_table')
-    def test_dynamodb_error_returns_500(self, mock_table):
+    def test_dynamodb_error_returns_500(self, fake_dynamodb):
         """Test that DynamoDB errors return 500 (Requirement 9.5)"""
         # Arrange
         user_id = 'error-user'
         
         # Simulate DynamoDB error
-        error_response = {'Error': {'Code': 'InternalServerError', 'Message': 'DynamoDB error'}}
-        mock_table.get_item.side_effect = ClientError(error_response, 'GetItem')
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': 'error@example.com'
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        fake_dynamodb.get_item_side_effect = _DDB_ERR
+        
+        event = make_event(sub=user_id, email='error@example.com')
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 500
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_error(body)
         assert body['error']['code'] == 'INTERNAL_ERROR'
     
     def test_options_request_returns_200(self):
         """Test that OPTIONS request returns 200 for CORS preflight"""
         # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'OPTIONS',
-                    'path': '/profile'
-                }
-            },
-            'headers': {
-                'origin': 'https://crm.antesdefirmar.org'
-            }
-        }
+        event = make_event(method='OPTIONS', origin='https://crm.antesdefirmar.org')
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
@@ -392,155 +348,197 @@ class TestProfileHandlerErrorHandling:
     def test_invalid_endpoint_returns_404(self):
         """Test that invalid endpoint returns 404"""
         # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/invalid'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': 'test-user'
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        event = make_event(sub='test-user', path='/invalid')
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 404
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_error(body)
         assert body['error']['code'] == 'NOT_FOUND'
     
-    @patch('profile_handler.users_table')
-    def test_update_profile_missing_fields_returns_400(self, mock_table):
-        """Test that PUT request with missing required fields returns 400"""
+    def test_update_profile_missing_fields_returns_400(self, fake_dynamodb):
+        """Test that PUT request without any updatable field returns 400"""
         # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'PUT',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': 'test-user'
-                        }
-                    }
-                }
-            },
-            'headers': {},
-            'body': json.dumps({'nombre': 'Test'})  # Missing 'apellido'
-        }
+        event = make_event(sub='test-user', method='PUT', body=_PUT_BODY_MISSING)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 400
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_error(body)
         assert body['error']['code'] == 'VALIDATION_ERROR'
+        assert fake_dynamodb.calls_to('update_item') == []
     
-    @patch('profile_handler.users_table')
-    def test_update_profile_invalid_json_returns_400(self, mock_table):
+    def test_update_profile_invalid_json_returns_400(self):
         """Test that PUT request with invalid JSON returns 400"""
         # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'PUT',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': 'test-user'
-                        }
-                    }
-                }
-            },
-            'headers': {},
-            'body': 'invalid json'
-        }
+        event = make_event(sub='test-user', method='PUT', body=_INVALID_JSON)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 400
-        body = json.loads(response['body'])
+        body = body_of(response)
+        _validate_error(body)
         assert body['error']['code'] == 'INVALID_JSON'
 
 
-class TestProfileHandlerCORS:
-    """Test CORS header handling"""
+class TestProfileHandlerUpdate:
+    """Test PUT request updates the profile in a single round trip"""
     
-    def test_cors_headers_for_cloudfront_origin(self):
-        """Test that CORS headers are set correctly for CloudFront origin"""
+    def test_update_profile_returns_updated_item_without_reread(self, fake_dynamodb):
+        """Test that PUT returns the ALL_NEW attributes from update_item without another GetItem"""
         # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'OPTIONS',
-                    'path': '/profile'
-                }
-            },
-            'headers': {
-                'origin': 'https://d4srl7zbv9blh.cloudfront.net'
-            }
-        }
+        user_id = 'update-user'
+        fake_dynamodb.update_item_return = {'Attributes': marshal({
+            'userId': user_id,
+            'email': 'update@example.com',
+            'nombre': 'Nuevo',
+            'apellido': 'Nombre',
+            'phone': '',
+            'company': ''
+        })}
+        event = make_event(sub=user_id, method='PUT',
+                           body=json.dumps({'nombre': 'Nuevo', 'apellido': 'Nombre'}))
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
-        assert response['headers']['Access-Control-Allow-Origin'] == 'https://d4srl7zbv9blh.cloudfront.net'
-        assert response['headers']['Access-Control-Allow-Credentials'] == 'true'
+        assert response['statusCode'] == 200
+        body = body_of(response)
+        _validate_profile(body)
+        assert body['nombre'] == 'Nuevo'
+        assert body['profileImageUrl'] is None
+        assert fake_dynamodb.calls_to('get_item') == []
+        update = fake_dynamodb.calls_to('update_item')[0]
+        assert update['UpdateExpression'] == 'SET nombre = :nombre, apellido = :apellido'
+        assert update['ReturnValues'] == 'ALL_NEW'
     
-    def test_cors_headers_for_custom_domain(self):
-        """Test that CORS headers are set correctly for custom domain"""
+    def test_update_profile_partial_body_sets_only_given_fields(self, fake_dynamodb):
+        """Test that PUT with only nombre is a valid PATCH and leaves apellido untouched"""
         # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'OPTIONS',
-                    'path': '/profile'
-                }
-            },
-            'headers': {
-                'origin': 'https://crm.antesdefirmar.org'
-            }
-        }
+        user_id = 'patch-user'
+        fake_dynamodb.update_item_return = {'Attributes': marshal({
+            'userId': user_id,
+            'email': 'patch@example.com',
+            'nombre': 'Test',
+            'apellido': 'Existente',
+            'phone': '',
+            'company': ''
+        })}
+        event = make_event(sub=user_id, method='PUT', body=json.dumps({'nombre': 'Test'}))
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
-        assert response['headers']['Access-Control-Allow-Origin'] == 'https://crm.antesdefirmar.org'
+        assert response['statusCode'] == 200
+        body = body_of(response)
+        _validate_profile(body)
+        assert body['apellido'] == 'Existente'
+        update = fake_dynamodb.calls_to('update_item')[0]
+        assert update['UpdateExpression'] == 'SET nombre = :nombre'
     
-    def test_cors_headers_for_unknown_origin(self):
-        """Test that CORS headers default to CloudFront for unknown origin"""
+    def test_update_profile_with_unchanged_values_returns_stored_profile(self, fake_dynamodb):
+        """Test that a PUT repeating the stored values returns the profile from the failed change condition"""
         # Arrange
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'OPTIONS',
-                    'path': '/profile'
-                }
-            },
-            'headers': {
-                'origin': 'https://unknown.com'
-            }
-        }
+        user_id = 'update-user'
+        fake_dynamodb.update_item_side_effect = ClientError({
+            'Error': {'Code': 'ConditionalCheckFailedException'},
+            'Item': marshal({
+                'userId': user_id,
+                'email': 'update@example.com',
+                'nombre': 'Igual',
+                'apellido': 'Nombre',
+                'phone': '',
+                'company': ''
+            })
+        }, 'UpdateItem')
+        event = make_event(sub=user_id, method='PUT', body=json.dumps({'nombre': 'Igual'}))
+        
+        # Act
+        response = profile_handler.lambda_handler(event, None)
+        
+        # Assert
+        assert response['statusCode'] == 200
+        body = body_of(response)
+        _validate_profile(body)
+        assert body['nombre'] == 'Igual'
+        update = fake_dynamodb.calls_to('update_item')[0]
+        assert update['ConditionExpression'] == 'attribute_not_exists(nombre) OR nombre <> :nombre'
+        assert update['ReturnValuesOnConditionCheckFailure'] == 'ALL_OLD'
+        assert fake_dynamodb.calls_to('get_item') == []
+
+
+class TestProfileHandlerImageUpload:
+    """Test POST /profile/image presigns the upload and records its metadata"""
+    
+    @pytest.fixture
+    def s3_client(self, monkeypatch):
+        client = MagicMock()
+        client.generate_presigned_url.return_value = 'https://signed.example/upload'
+        monkeypatch.setattr(profile_handler, 'get_s3_client', lambda: client)
+        return client
+    
+    def test_image_upload_saves_metadata_for_existing_profile(self, fake_dynamodb, s3_client):
+        """Test that the metadata update is conditioned on the profile existing and omits the file name"""
+        # Arrange
+        event = make_event(sub='image-user', method='POST', path='/profile/image',
+                           body=json.dumps({'fileName': 'avatar.png', 'contentType': 'image/png'}))
+        
+        # Act
+        response = profile_handler.lambda_handler(event, None)
+        
+        # Assert
+        assert response['statusCode'] == 200
+        body = body_of(response)
+        assert body['presignedUrl'] == 'https://signed.example/upload'
+        assert body['s3Key'].startswith('profiles/image-user/') and body['s3Key'].endswith('.png')
+        update = fake_dynamodb.calls_to('update_item')[0]
+        assert update['ConditionExpression'] == 'attribute_exists(userId)'
+        assert ':fileName' not in update['ExpressionAttributeValues']
+    
+    def test_image_upload_for_missing_profile_returns_404(self, fake_dynamodb, s3_client):
+        """Test that an upload for a user without a profile is rejected instead of creating a partial row"""
+        # Arrange
+        fake_dynamodb.update_item_side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+        event = make_event(sub='ghost-user', method='POST', path='/profile/image',
+                           body=json.dumps({'fileName': 'avatar.png', 'contentType': 'image/png'}))
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
-        assert response['headers']['Access-Control-Allow-Origin'] == 'https://d4srl7zbv9blh.cloudfront.net'
+        assert response['statusCode'] == 404
+        body = body_of(response)
+        _validate_error(body)
+        assert body['error']['code'] == 'PROFILE_NOT_FOUND'
+
+
+class TestProfileHandlerCORS:
+    """Test CORS header handling"""
+    
+    @pytest.mark.parametrize('origin,expected', [
+        ('https://d4srl7zbv9blh.cloudfront.net', 'https://d4srl7zbv9blh.cloudfront.net'),
+        ('https://crm.antesdefirmar.org', 'https://crm.antesdefirmar.org'),
+        ('https://unknown.com', 'https://d4srl7zbv9blh.cloudfront.net'),  # Defaults to CloudFront
+    ])
+    def test_cors_origin(self, origin, expected):
+        """Test that CORS headers echo allowed origins and default to CloudFront for unknown ones"""
+        # Arrange
+        event = make_event(method='OPTIONS', origin=origin)
+        
+        # Act
+        response = profile_handler.lambda_handler(event, None)
+        
+        # Assert
+        assert response['headers']['Access-Control-Allow-Origin'] == expected
+        assert response['headers']['Access-Control-Allow-Credentials'] == 'true'
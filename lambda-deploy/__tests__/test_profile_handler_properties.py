@@ -5,50 +5,74 @@ Feature: cloudfront-routing-fix, Property 4: Profile Lambda Idempotent Upsert
 Validates: Requirements 9.1, 9.3
 """
 import json
-import os
 import pytest
 from hypothesis import given, strategies as st, settings
-from unittest.mock import patch, MagicMock
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from botocore.exceptions import ClientError
+from unittest.mock import MagicMock
 
-# Set environment variables before importing handler
-os.environ['DYNAMODB_USERS_TABLE'] = 'Users'
-os.environ['S3_BUCKET_NAME'] = 'polizalab-documents-dev'
+import profile_handler
+
+# Event skeleton reused by every example; only the JWT claims change between draws
+BASE_EVENT = {
+    'requestContext': {
+        'http': {
+            'method': 'GET',
+            'path': '/profile'
+        },
+        'authorizer': {
+            'jwt': {
+                'claims': {}
+            }
+        }
+    },
+    'headers': {}
+}
+
+
+def event_with_claims(**claims):
+    """Point the shared GET /profile event at a new set of JWT claims"""
+    BASE_EVENT['requestContext']['authorizer']['jwt']['claims'] = claims
+    return BASE_EVENT
 
-# Import after setting environment variables
-import sys
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from profile_handler import lambda_handler
+
+def default_profile_upsert(store):
+    """update_item side effect applying the if_not_exists default-profile update to a dict store keyed by userId"""
+    def update_item(**kwargs):
+        values = kwargs['ExpressionAttributeValues']
+        stored = store.setdefault(kwargs['Key']['userId']['S'], dict(kwargs['Key']))
+        for attr, value in (('email', values[':email']), ('nombre', values[':nombre']),
+                            ('apellido', values[':empty']), ('phone', values[':empty']),
+                            ('company', values[':empty']), ('createdAt', values[':createdAt'])):
+            stored.setdefault(attr, value)
+        return {'Attributes': dict(stored)}
+    return update_item
+
+
+@pytest.fixture(autouse=True)
+def mock_dynamodb(monkeypatch):
+    """Install a spec-constrained MagicMock as profile_handler.dynamodb for the whole test function"""
+    client = MagicMock(spec=['get_item', 'update_item'])
+    monkeypatch.setattr(profile_handler, 'dynamodb', client)
+    return client
 
 
 # Custom strategies for generating valid test data
-@st.composite
-def user_id_strategy(draw):
-    """Generate valid user IDs (alphanumeric with hyphens)"""
-    # Generate UUID-like strings or simple alphanumeric IDs
-    return draw(st.text(
-        alphabet=st.characters(whitelist_categories=('Lu', 'Ll', 'Nd'), whitelist_characters='-'),
-        min_size=5,
-        max_size=50
-    ).filter(lambda x: x and not x.startswith('-') and not x.endswith('-')))
+# Shapes are built to be valid by construction so Hypothesis never has to reject draws
+_NAME_CHARS = 'A-Za-zÁÉÍÓÚÑÜáéíóúñü'
+
 
+def user_id_strategy():
+    """Generate valid user IDs (alphanumeric with inner hyphens)"""
+    return st.from_regex(r'[A-Za-z0-9][A-Za-z0-9-]{3,48}[A-Za-z0-9]', fullmatch=True)
 
-@st.composite
-def email_strategy(draw):
+
+def email_strategy():
     """Generate valid email addresses"""
-    # Use hypothesis email strategy
-    return draw(st.emails())
+    return st.emails()
 
 
-@st.composite
-def name_strategy(draw):
-    """Generate valid names (non-empty strings)"""
-    return draw(st.text(
-        alphabet=st.characters(whitelist_categories=('Lu', 'Ll', 'Zs')),
-        min_size=1,
-        max_size=100
-    ).filter(lambda x: x.strip()))
+def name_strategy():
+    """Generate valid names (start with a letter, then letters and spaces)"""
+    return st.from_regex(rf'[{_NAME_CHARS}][{_NAME_CHARS} ]{{0,99}}', fullmatch=True)
 
 
 class TestProfileLambdaIdempotentUpsert:
@@ -63,14 +87,12 @@ class TestProfileLambdaIdempotentUpsert:
     Validates: Requirements 9.1, 9.3
     """
     
-    @settings(max_examples=100, deadline=None)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy(),
         name=name_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_single_request_creates_profile_exactly_once(self, mock_table, user_id, email, name):
+    def test_single_request_creates_profile_exactly_once(self, mock_dynamodb, user_id, email, name):
         """
         Property: Single GET request for non-existent profile creates exactly one profile
         
@@ -80,30 +102,14 @@ class TestProfileLambdaIdempotentUpsert:
         3. Return the created profile with status 200
         """
         # Arrange: Mock DynamoDB to simulate non-existent profile
-        mock_table.get_item.return_value = {}  # No existing profile
-        mock_table.put_item.return_value = {}  # Successful creation
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': name
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
+        mock_dynamodb.get_item.return_value = {}  # No existing profile
+        mock_dynamodb.update_item.side_effect = default_profile_upsert({})  # Successful creation
+        
+        event = event_with_claims(sub=user_id, email=email, name=name)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200, f"Expected 200, got {response['statusCode']}"
@@ -116,20 +122,19 @@ class TestProfileLambdaIdempotentUpsert:
         assert body['phone'] == '', "Expected empty phone"
         assert body['company'] == '', "Expected empty company"
         
-        # Verify put_item was called exactly once with correct parameters
-        assert mock_table.put_item.call_count == 1, f"Expected put_item called once, got {mock_table.put_item.call_count}"
-        call_args = mock_table.put_item.call_args
-        assert call_args[1]['Item']['userId'] == user_id
-        assert call_args[1]['ConditionExpression'] == 'attribute_not_exists(userId)'
+        # Verify update_item was called exactly once with correct parameters
+        assert mock_dynamodb.update_item.call_count == 1, f"Expected update_item called once, got {mock_dynamodb.update_item.call_count}"
+        call_args = mock_dynamodb.update_item.call_args
+        assert call_args[1]['Key'] == {'userId': {'S': user_id}}
+        assert call_args[1]['UpdateExpression'] == profile_handler.DEFAULT_PROFILE_UPDATE_EXPRESSION
     
-    @settings(max_examples=50, deadline=None)
+    @settings(max_examples=15)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy(),
         name=name_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_concurrent_requests_create_exactly_one_profile(self, mock_table, user_id, email, name):
+    def test_concurrent_requests_create_exactly_one_profile(self, mock_dynamodb, user_id, email, name):
         """
         Property: Concurrent GET requests for non-existent profile create exactly one profile
         
@@ -138,74 +143,25 @@ class TestProfileLambdaIdempotentUpsert:
         2. All requests should succeed with status 200
         3. All requests should receive the same profile data
         
-        This tests the idempotent upsert behavior with ConditionExpression.
+        This tests the idempotent upsert behavior with if_not_exists. The race is
+        replayed deterministically: every request saw the profile missing, the first
+        update_item creates it and the rest leave the stored attributes untouched.
         """
         # Arrange: Simulate concurrent creation scenario
-        # Track how many times put_item is actually called
-        put_item_call_count = 0
-        created_profile = {
-            'userId': user_id,
-            'email': email,
-            'nombre': name,
-            'apellido': '',
-            'phone': '',
-            'company': ''
-        }
-        
-        def mock_get_item(Key):
-            """Mock get_item: first call returns empty, subsequent calls return profile"""
-            if mock_table.get_item.call_count <= 1:
-                return {}  # Profile doesn't exist yet
-            else:
-                return {'Item': created_profile}  # Profile exists now
-        
-        def mock_put_item(Item, ConditionExpression):
-            """Mock put_item: first call succeeds, subsequent calls raise ConditionalCheckFailedException"""
-            nonlocal put_item_call_count
-            put_item_call_count += 1
-            
-            if put_item_call_count == 1:
-                # First call succeeds
-                return {}
-            else:
-                # Subsequent calls fail with ConditionalCheckFailedException
-                error_response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
-                raise ClientError(error_response, 'PutItem')
-        
-        mock_table.get_item.side_effect = mock_get_item
-        mock_table.put_item.side_effect = mock_put_item
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': name
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
-        
-        # Act: Simulate 5 concurrent requests
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
         num_concurrent_requests = 5
-        responses = []
+        store = {}
+        
+        # Every request misses on the read, then all of them upsert into the same store
+        mock_dynamodb.get_item.return_value = {}
+        mock_dynamodb.update_item.side_effect = default_profile_upsert(store)
         
-        with ThreadPoolExecutor(max_workers=num_concurrent_requests) as executor:
-            futures = [executor.submit(lambda_handler, event, None) for _ in range(num_concurrent_requests)]
-            for future in as_completed(futures):
-                responses.append(future.result())
+        event = event_with_claims(sub=user_id, email=email, name=name)
         
-        # Assert: All requests should succeed
-        assert len(responses) == num_concurrent_requests, f"Expected {num_concurrent_requests} responses, got {len(responses)}"
+        # Act
+        responses = [profile_handler.lambda_handler(event, None) for _ in range(num_concurrent_requests)]
         
+        # Assert: All requests should succeed with the same profile
         for i, response in enumerate(responses):
             assert response['statusCode'] == 200, f"Request {i} failed with status {response['statusCode']}"
             
@@ -213,17 +169,17 @@ class TestProfileLambdaIdempotentUpsert:
             assert body['userId'] == user_id, f"Request {i}: Expected userId {user_id}, got {body.get('userId')}"
             assert body['email'] == email, f"Request {i}: Expected email {email}, got {body.get('email')}"
         
-        # Verify that put_item was attempted (at least once, possibly more due to concurrency)
-        # The key property is that all requests succeeded, not how many times put_item was called
-        assert put_item_call_count >= 1, "Expected at least one put_item call"
+        # Every request wrote once and none re-read; exactly one profile exists
+        assert mock_dynamodb.update_item.call_count == num_concurrent_requests
+        assert mock_dynamodb.get_item.call_count == num_concurrent_requests
+        assert list(store) == [user_id]
+        assert len({response['body'] for response in responses}) == 1
     
-    @settings(max_examples=100, deadline=None)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_missing_name_claim_uses_email_as_fallback(self, mock_table, user_id, email):
+    def test_missing_name_claim_uses_email_as_fallback(self, mock_dynamodb, user_id, email):
         """
         Property: When name claim is missing, email is used as fallback for nombre
         
@@ -232,53 +188,37 @@ class TestProfileLambdaIdempotentUpsert:
         2. The nombre field should be set to the email value
         """
         # Arrange
-        mock_table.get_item.return_value = {}
-        mock_table.put_item.return_value = {}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email
-                            # No 'name' claim
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
+        mock_dynamodb.get_item.return_value = {}
+        mock_dynamodb.update_item.side_effect = default_profile_upsert({})
+        
+        # No 'name' claim
+        event = event_with_claims(sub=user_id, email=email)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
         body = json.loads(response['body'])
         assert body['nombre'] == email, f"Expected nombre to be {email}, got {body.get('nombre')}"
     
-    @settings(max_examples=100, deadline=None)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy(),
         name=name_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_conditional_check_failure_fetches_existing_profile(self, mock_table, user_id, email, name):
+    def test_concurrently_created_profile_is_not_overwritten(self, mock_dynamodb, user_id, email, name):
         """
-        Property: When ConditionalCheckFailedException occurs, existing profile is fetched
+        Property: A profile created between the read and the upsert is kept as-is
         
-        For any valid user_id, email, and name, when put_item fails due to concurrent creation:
-        1. The lambda should catch ConditionalCheckFailedException
-        2. The lambda should fetch the existing profile
+        For any valid user_id, email, and name, when another request stores the profile first:
+        1. The lambda's upsert should not overwrite the stored attributes
+        2. The lambda should not need to re-read the profile
         3. The lambda should return the existing profile with status 200
         """
         # Arrange: Simulate race condition
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
         existing_profile = {
             'userId': user_id,
             'email': email,
@@ -288,37 +228,15 @@ class TestProfileLambdaIdempotentUpsert:
             'company': 'Existing Company'
         }
         
-        # First get_item returns empty, second returns existing profile
-        mock_table.get_item.side_effect = [
-            {},  # Profile doesn't exist initially
-            {'Item': existing_profile}  # Profile exists after ConditionalCheckFailedException
-        ]
-        
-        # put_item raises ConditionalCheckFailedException
-        error_response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
-        mock_table.put_item.side_effect = ClientError(error_response, 'PutItem')
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': name
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        # get_item misses, but the profile is stored by the time update_item runs
+        mock_dynamodb.get_item.return_value = {}
+        store = {user_id: profile_handler.to_attribute_values(existing_profile)}
+        mock_dynamodb.update_item.side_effect = default_profile_upsert(store)
+        
+        event = event_with_claims(sub=user_id, email=email, name=name)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
@@ -328,8 +246,8 @@ class TestProfileLambdaIdempotentUpsert:
         # Should return the existing profile data, not the default
         assert body['apellido'] == 'Existing'
         
-        # Verify get_item was called twice
-        assert mock_table.get_item.call_count == 2
+        # Verify get_item was called once
+        assert mock_dynamodb.get_item.call_count == 1
 
 
 class TestProfileLambdaTokenExtraction:
@@ -342,14 +260,12 @@ class TestProfileLambdaTokenExtraction:
     Validates: Requirements 9.4
     """
     
-    @settings(max_examples=100, deadline=None)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy(),
         name=name_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_token_claims_extracted_correctly_with_name(self, mock_table, user_id, email, name):
+    def test_token_claims_extracted_correctly_with_name(self, mock_dynamodb, user_id, email, name):
         """
         Property: Lambda correctly extracts email and name from JWT token claims
         
@@ -359,30 +275,14 @@ class TestProfileLambdaTokenExtraction:
         3. The created profile should use these extracted values
         """
         # Arrange
-        mock_table.get_item.return_value = {}  # No existing profile
-        mock_table.put_item.return_value = {}  # Successful creation
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': name
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
+        mock_dynamodb.get_item.return_value = {}  # No existing profile
+        mock_dynamodb.update_item.side_effect = default_profile_upsert({})  # Successful creation
+        
+        event = event_with_claims(sub=user_id, email=email, name=name)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200, f"Expected 200, got {response['statusCode']}"
@@ -395,20 +295,18 @@ class TestProfileLambdaTokenExtraction:
         # Verify name was extracted correctly
         assert body['nombre'] == name, f"Name not extracted correctly: expected {name}, got {body.get('nombre')}"
         
-        # Verify put_item was called with extracted values
-        assert mock_table.put_item.call_count == 1
-        call_args = mock_table.put_item.call_args
-        created_item = call_args[1]['Item']
-        assert created_item['email'] == email, "Email not passed to DynamoDB correctly"
-        assert created_item['nombre'] == name, "Name not passed to DynamoDB correctly"
+        # Verify update_item was called with extracted values
+        assert mock_dynamodb.update_item.call_count == 1
+        call_args = mock_dynamodb.update_item.call_args
+        values = call_args[1]['ExpressionAttributeValues']
+        assert values[':email'] == {'S': email}, "Email not passed to DynamoDB correctly"
+        assert values[':nombre'] == {'S': name}, "Name not passed to DynamoDB correctly"
     
-    @settings(max_examples=100, deadline=None)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_token_claims_extracted_with_missing_name_uses_email_fallback(self, mock_table, user_id, email):
+    def test_token_claims_extracted_with_missing_name_uses_email_fallback(self, mock_dynamodb, user_id, email):
         """
         Property: When name claim is missing, email is used as fallback
         
@@ -418,30 +316,15 @@ class TestProfileLambdaTokenExtraction:
         3. The created profile should have nombre set to email
         """
         # Arrange
-        mock_table.get_item.return_value = {}
-        mock_table.put_item.return_value = {}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email
-                            # No 'name' claim
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
+        mock_dynamodb.get_item.return_value = {}
+        mock_dynamodb.update_item.side_effect = default_profile_upsert({})
+        
+        # No 'name' claim
+        event = event_with_claims(sub=user_id, email=email)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
@@ -454,19 +337,17 @@ class TestProfileLambdaTokenExtraction:
         # Verify email was used as fallback for name
         assert body['nombre'] == email, f"Email fallback not used for nombre: expected {email}, got {body.get('nombre')}"
         
-        # Verify put_item was called with email as nombre
-        call_args = mock_table.put_item.call_args
-        created_item = call_args[1]['Item']
-        assert created_item['nombre'] == email, "Email fallback not passed to DynamoDB correctly"
+        # Verify update_item was called with email as nombre
+        call_args = mock_dynamodb.update_item.call_args
+        values = call_args[1]['ExpressionAttributeValues']
+        assert values[':nombre'] == {'S': email}, "Email fallback not passed to DynamoDB correctly"
     
-    @settings(max_examples=100, deadline=None)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy(),
         name=name_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_token_extraction_preserves_all_claim_values(self, mock_table, user_id, email, name):
+    def test_token_extraction_preserves_all_claim_values(self, mock_dynamodb, user_id, email, name):
         """
         Property: Token extraction preserves exact claim values without modification
         
@@ -476,30 +357,14 @@ class TestProfileLambdaTokenExtraction:
         3. Return the exact values in the response
         """
         # Arrange
-        mock_table.get_item.return_value = {}
-        mock_table.put_item.return_value = {}
-        
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': name
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
+        mock_dynamodb.get_item.return_value = {}
+        mock_dynamodb.update_item.side_effect = default_profile_upsert({})
+        
+        event = event_with_claims(sub=user_id, email=email, name=name)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         body = json.loads(response['body'])
@@ -510,20 +375,19 @@ class TestProfileLambdaTokenExtraction:
         assert body['nombre'] == name, "Name was modified during extraction"
         
         # Verify exact values passed to DynamoDB
-        call_args = mock_table.put_item.call_args
-        created_item = call_args[1]['Item']
-        assert created_item['userId'] == user_id, "userId was modified before DynamoDB"
-        assert created_item['email'] == email, "Email was modified before DynamoDB"
-        assert created_item['nombre'] == name, "Name was modified before DynamoDB"
+        call_args = mock_dynamodb.update_item.call_args
+        values = call_args[1]['ExpressionAttributeValues']
+        assert call_args[1]['Key'] == {'userId': {'S': user_id}}, "userId was modified before DynamoDB"
+        assert values[':email'] == {'S': email}, "Email was modified before DynamoDB"
+        assert values[':nombre'] == {'S': name}, "Name was modified before DynamoDB"
     
-    @settings(max_examples=50, deadline=None)
+    @settings(max_examples=15)
     @given(
         user_id=user_id_strategy(),
         email=email_strategy(),
         name=name_strategy()
     )
-    @patch('profile_handler.users_table')
-    def test_token_extraction_works_with_nested_claims_structure(self, mock_table, user_id, email, name):
+    def test_token_extraction_works_with_nested_claims_structure(self, mock_dynamodb, user_id, email, name):
         """
         Property: Token extraction correctly navigates nested JWT claims structure
         
@@ -533,31 +397,15 @@ class TestProfileLambdaTokenExtraction:
         3. Handle missing intermediate keys gracefully
         """
         # Arrange
-        mock_table.get_item.return_value = {}
-        mock_table.put_item.return_value = {}
+        mock_dynamodb.reset_mock(return_value=True, side_effect=True)
+        mock_dynamodb.get_item.return_value = {}
+        mock_dynamodb.update_item.side_effect = default_profile_upsert({})
         
         # Test with correct nested structure
-        event = {
-            'requestContext': {
-                'http': {
-                    'method': 'GET',
-                    'path': '/profile'
-                },
-                'authorizer': {
-                    'jwt': {
-                        'claims': {
-                            'sub': user_id,
-                            'email': email,
-                            'name': name
-                        }
-                    }
-                }
-            },
-            'headers': {}
-        }
+        event = event_with_claims(sub=user_id, email=email, name=name)
         
         # Act
-        response = lambda_handler(event, None)
+        response = profile_handler.lambda_handler(event, None)
         
         # Assert
         assert response['statusCode'] == 200
@@ -566,8 +414,8 @@ class TestProfileLambdaTokenExtraction:
         assert body['nombre'] == name
         
         # Verify the lambda navigated the nested structure correctly
-        call_args = mock_table.put_item.call_args
-        assert call_args is not None, "put_item was not called - claims extraction failed"
+        call_args = mock_dynamodb.update_item.call_args
+        assert call_args is not None, "update_item was not called - claims extraction failed"
 
 
 if __name__ == '__main__':
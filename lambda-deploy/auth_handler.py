@@ -3,137 +3,228 @@ Auth Handler Lambda Function
 Handles user registration by creating a user record in DynamoDB
 """
 import json
+import logging
 import os
-from datetime import datetime
-import boto3
-from botocore.exceptions import ClientError
+import re
+import time
+
+# orjson is bundled in the deployment package when available; stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_dumps(obj):
+    """Serialize obj to a JSON string, stringifying unsupported types"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode()
+    # Compact separators match orjson's output and keep response bodies small
+    return json.dumps(obj, default=str, separators=(',', ':'))
+
+def json_loads(data):
+    """Parse a JSON string; raises json.JSONDecodeError on invalid input"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+# DynamoDB client, created on first write so OPTIONS/404 cold starts never import boto3.
+# Built once per container so warm invocations reuse the endpoint resolver, signer
+# and pooled keep-alive connections
+_dynamodb = None
+
+def get_dynamodb():
+    """Return the shared DynamoDB client, creating it on first use"""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        from botocore.config import Config
+        
+        boto_config = Config(
+            connect_timeout=1,
+            read_timeout=2,
+            retries={'mode': 'standard', 'max_attempts': 3},
+            tcp_keepalive=True,
+            max_pool_connections=10
+        )
+        _dynamodb = boto3.client('dynamodb', config=boto_config)
+    return _dynamodb
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('DYNAMODB_USERS_TABLE', 'Users')
-users_table = dynamodb.Table(table_name)
 
-def lambda_handler(event, context):
-    """Main Lambda handler"""
-    print(f"Auth Handler invoked: {json.dumps(event)}")
-    
-    # CORS headers - Allow both CloudFront and custom domain
-    origin = event.get('headers', {}).get('origin', '')
-    allowed_origins = [
-        'https://d4srl7zbv9blh.cloudfront.net',
-        'https://crm.antesdefirmar.org'
-    ]
-    
-    # Set CORS origin based on request origin
-    cors_origin = origin if origin in allowed_origins else allowed_origins[0]
-    
-    headers = {
+# Registration payloads only carry two short fields
+MAX_REGISTER_BODY_LENGTH = 1024
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# CORS headers - Allow both CloudFront and custom domain
+ALLOWED_ORIGINS = (
+    'https://d4srl7zbv9blh.cloudfront.net',
+    'https://crm.antesdefirmar.org'
+)
+
+# One headers dict per allowed origin, built once; unknown origins get the first one
+CORS_HEADERS = {
+    allowed_origin: {
         'Content-Type': 'application/json',
-        'Access-Control-Allow-Origin': cors_origin,
+        'Access-Control-Allow-Origin': allowed_origin,
         'Access-Control-Allow-Headers': 'Content-Type,Authorization',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
         'Access-Control-Allow-Credentials': 'true'
     }
+    for allowed_origin in ALLOWED_ORIGINS
+}
+DEFAULT_CORS_HEADERS = CORS_HEADERS[ALLOWED_ORIGINS[0]]
+
+# CORS preflight responses are fully static per origin
+PREFLIGHT_RESPONSES = {
+    allowed_origin: {
+        'statusCode': 200,
+        'headers': cors_headers,
+        'body': ''
+    }
+    for allowed_origin, cors_headers in CORS_HEADERS.items()
+}
+DEFAULT_PREFLIGHT_RESPONSE = PREFLIGHT_RESPONSES[ALLOWED_ORIGINS[0]]
+
+def _error_body(code, message):
+    """Serialize the standard error envelope"""
+    return json_dumps({
+        'error': {
+            'code': code,
+            'message': message
+        }
+    })
+
+# Static error bodies, serialized once at import
+NOT_FOUND_BODY = _error_body('NOT_FOUND', 'Endpoint not found')
+INTERNAL_ERROR_BODY = _error_body('INTERNAL_ERROR', 'An unexpected error occurred')
+VALIDATION_ERROR_BODY = _error_body('VALIDATION_ERROR', 'cognitoUserId and a valid email are required')
+USER_EXISTS_BODY = _error_body('USER_EXISTS', 'User already exists')
+INVALID_JSON_BODY = _error_body('INVALID_JSON', 'Invalid JSON in request body')
+REGISTER_FAILED_BODY = _error_body('INTERNAL_ERROR', 'Failed to create user record')
+
+def utc_now_iso():
+    """Current UTC time as ISO-8601 with microseconds and a Z suffix, without building a datetime"""
+    now = time.time()
+    t = time.gmtime(now)
+    return (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+        f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}.{int(now % 1 * 1_000_000):06d}Z"
+    )
+
+def lambda_handler(event, context):
+    """Main Lambda handler"""
+    origin = event.get('headers', {}).get('origin', '')
+    headers = CORS_HEADERS.get(origin, DEFAULT_CORS_HEADERS)
+    
+    try:
+        http = event['requestContext']['http']
+        http_method = http['method']
+        path = http['path']
+    except (KeyError, TypeError):
+        http_method = path = ''
+    
+    # Handle OPTIONS for CORS preflight before logging anything
+    if http_method == 'OPTIONS':
+        return PREFLIGHT_RESPONSES.get(origin, DEFAULT_PREFLIGHT_RESPONSE)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Auth Handler invoked: %s", json_dumps(event))
+    else:
+        logger.info("Auth Handler invoked: %s %s", http_method, path)
     
     try:
-        # Handle OPTIONS for CORS preflight
-        http_method = event.get('requestContext', {}).get('http', {}).get('method', '')
-        if http_method == 'OPTIONS':
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'body': ''
-            }
-        
         # Handle POST /auth/register
-        path = event.get('requestContext', {}).get('http', {}).get('path', '')
         if path == '/auth/register' and http_method == 'POST':
             return handle_register(event, headers)
         
         return {
             'statusCode': 404,
             'headers': headers,
-            'body': json.dumps({
-                'error': {
-                    'code': 'NOT_FOUND',
-                    'message': 'Endpoint not found'
-                }
-            })
+            'body': NOT_FOUND_BODY
         }
         
     except Exception as e:
-        print(f"Error in lambda_handler: {str(e)}")
+        logger.error("Error in lambda_handler: %s", e)
         return {
             'statusCode': 500,
             'headers': headers,
-            'body': json.dumps({
-                'error': {
-                    'code': 'INTERNAL_ERROR',
-                    'message': 'An unexpected error occurred'
-                }
-            })
+            'body': INTERNAL_ERROR_BODY
         }
 
 def handle_register(event, headers):
     """Handle POST /auth/register"""
     try:
+        # Cheap checks on the raw body first so oversized or junk payloads never reach the parser
+        body_raw = event.get('body') or ''
+        if len(body_raw) > MAX_REGISTER_BODY_LENGTH or 'cognitoUserId' not in body_raw:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': VALIDATION_ERROR_BODY
+            }
+        
         # Parse request body
-        body = json.loads(event.get('body', '{}'))
+        body = json_loads(body_raw)
+        if not isinstance(body, dict):
+            body = {}
         
         # Validate required fields
         cognito_user_id = body.get('cognitoUserId')
         email = body.get('email')
         
-        if not cognito_user_id or not email:
+        if (not cognito_user_id or not isinstance(cognito_user_id, str)
+                or not isinstance(email, str) or not EMAIL_RE.match(email)):
             return {
                 'statusCode': 400,
                 'headers': headers,
-                'body': json.dumps({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': 'cognitoUserId and email are required'
-                    }
-                })
+                'body': VALIDATION_ERROR_BODY
             }
         
-        # Create user record
+        # Create user record, already in DynamoDB AttributeValue form so the
+        # low-level client can send it without a TypeSerializer pass
         user_record = {
-            'userId': cognito_user_id,
-            'email': email,
-            'nombre': None,
-            'apellido': None,
-            'profileImage': None,
-            'createdAt': datetime.utcnow().isoformat() + 'Z'
+            'userId': {'S': cognito_user_id},
+            'email': {'S': email},
+            'nombre': {'NULL': True},
+            'apellido': {'NULL': True},
+            'profileImage': {'NULL': True},
+            'createdAt': {'S': utc_now_iso()}
         }
         
-        print(f"Creating user record: {cognito_user_id}")
+        logger.info("Creating user record: %s", cognito_user_id)
         
-        # Put item with condition to prevent duplicates
+        # Put item with condition to prevent duplicates. Transient failures are retried
+        # by botocore (standard mode); if one of those retries lands after an earlier
+        # attempt already committed, the stored item is our own record, so compare it
+        # before reporting a duplicate
+        dynamodb = get_dynamodb()
+        from botocore.exceptions import ClientError
         try:
-            users_table.put_item(
+            dynamodb.put_item(
+                TableName=table_name,
                 Item=user_record,
-                ConditionExpression='attribute_not_exists(userId)'
+                ConditionExpression='attribute_not_exists(userId)',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
             )
         except ClientError as e:
-            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            if e.response.get('Item') != user_record:
                 return {
                     'statusCode': 409,
                     'headers': headers,
-                    'body': json.dumps({
-                        'error': {
-                            'code': 'USER_EXISTS',
-                            'message': 'User already exists'
-                        }
-                    })
+                    'body': USER_EXISTS_BODY
                 }
-            raise
         
-        print(f"User record created successfully: {cognito_user_id}")
+        logger.info("User record created successfully: %s", cognito_user_id)
         
         return {
             'statusCode': 201,
             'headers': headers,
-            'body': json.dumps({
+            'body': json_dumps({
                 'success': True,
                 'userId': cognito_user_id
             })
@@ -143,22 +234,12 @@ def handle_register(event, headers):
         return {
             'statusCode': 400,
             'headers': headers,
-            'body': json.dumps({
-                'error': {
-                    'code': 'INVALID_JSON',
-                    'message': 'Invalid JSON in request body'
-                }
-            })
+            'body': INVALID_JSON_BODY
         }
     except Exception as e:
-        print(f"Error in handle_register: {str(e)}")
+        logger.error("Error in handle_register: %s", e)
         return {
             'statusCode': 500,
             'headers': headers,
-            'body': json.dumps({
-                'error': {
-                    'code': 'INTERNAL_ERROR',
-                    'message': 'Failed to create user record'
-                }
-            })
+            'body': REGISTER_FAILED_BODY
         }
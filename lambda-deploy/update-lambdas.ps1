@@ -20,6 +20,7 @@ Write-Host "`nActualizando polizalab-profile-handler..." -ForegroundColor Yellow
 aws lambda update-function-code `
     --function-name polizalab-profile-handler `
     --zip-file fileb://profile_handler.zip `
+    --architectures arm64 `
     --region us-east-1
 
 if ($LASTEXITCODE -eq 0) {
@@ -33,6 +34,7 @@ Write-Host "`nActualizando polizalab-policy-handler..." -ForegroundColor Yellow
 aws lambda update-function-code `
     --function-name polizalab-policy-handler `
     --zip-file fileb://policy_handler.zip `
+    --architectures arm64 `
     --region us-east-1
 
 if ($LASTEXITCODE -eq 0) {
@@ -46,3 +48,4 @@ Write-Host "`nResumen de cambios:" -ForegroundColor Cyan
 Write-Host "- Headers CORS actualizados para soportar crm.antesdefirmar.org"
 Write-Host "- Headers CORS dinámicos basados en el origin de la solicitud"
 Write-Host "- Access-Control-Allow-Credentials habilitado"
+Write-Host "- polizalab-profile-handler y polizalab-policy-handler corren en arm64 (Graviton)"
@@ -0,0 +1,155 @@
+"""Shared fixtures for activity-handler tests."""
+import json
+import os
+import sys
+
+# Set env vars before importing handler
+os.environ.setdefault("ACTIVITIES_TABLE", "Activities")
+os.environ.setdefault("SYSTEM_TABLE", "ActivityTypesSystem")
+os.environ.setdefault("TENANT_ID", "default")
+os.environ.setdefault("ALLOWED_ORIGIN", "*")
+
+# Ensure the handler module is importable from tests/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import boto3
+import pytest
+from moto import mock_aws
+
+USER_ID = "usr-test-1"
+OTHER_USER_ID = "usr-test-2"
+TENANT_ID = "default"
+ACTIVITY_ID = "act-test-1"
+
+
+# ── DynamoDB table definitions ─────────────────────────────────────────────────
+
+def _gsi(name: str, hash_key: str, range_key: str) -> dict:
+    return {
+        "IndexName": name,
+        "KeySchema": [
+            {"AttributeName": hash_key, "KeyType": "HASH"},
+            {"AttributeName": range_key, "KeyType": "RANGE"},
+        ],
+        "Projection": {"ProjectionType": "ALL"},
+    }
+
+
+ACTIVITIES_TABLE_DEF = dict(
+    TableName="Activities",
+    AttributeDefinitions=[
+        {"AttributeName": name, "AttributeType": "S"}
+        for name in (
+            "tenantId", "activityId", "assignedTo", "dueDate",
+            "scheduledAt", "entityType_entityId", "createdAt",
+        )
+    ],
+    KeySchema=[
+        {"AttributeName": "tenantId", "KeyType": "HASH"},
+        {"AttributeName": "activityId", "KeyType": "RANGE"},
+    ],
+    GlobalSecondaryIndexes=[
+        _gsi("assignedTo-dueDate-index", "assignedTo", "dueDate"),
+        _gsi("assignedTo-scheduledAt-index", "assignedTo", "scheduledAt"),
+        _gsi("entity-index", "entityType_entityId", "createdAt"),
+    ],
+    BillingMode="PAY_PER_REQUEST",
+)
+
+SYSTEM_TABLE_DEF = dict(
+    TableName="ActivityTypesSystem",
+    AttributeDefinitions=[
+        {"AttributeName": "partitionKey", "AttributeType": "S"},
+        {"AttributeName": "code", "AttributeType": "S"},
+    ],
+    KeySchema=[
+        {"AttributeName": "partitionKey", "KeyType": "HASH"},
+        {"AttributeName": "code", "KeyType": "RANGE"},
+    ],
+    BillingMode="PAY_PER_REQUEST",
+)
+
+SYSTEM_TIPO_CODIGOS = ("LLAMADA", "REUNION")
+
+
+# ── Event factory ──────────────────────────────────────────────────────────────
+
+def make_event(
+    method: str,
+    path: str,
+    body: dict | None = None,
+    path_params: dict | None = None,
+    query_params: dict | None = None,
+    user_id: str = USER_ID,
+) -> dict:
+    """Build a minimal API Gateway HTTP API v2 event."""
+    return {
+        "rawPath": path,
+        "requestContext": {
+            "http": {"method": method, "path": path},
+            "authorizer": {"jwt": {"claims": {"sub": user_id}}},
+        },
+        "headers": {},
+        "pathParameters": path_params or {},
+        "queryStringParameters": query_params or {},
+        "body": json.dumps(body) if body is not None else None,
+    }
+
+
+# ── Shared seed items ──────────────────────────────────────────────────────────
+
+BASE_ACTIVITY = {
+    "tenantId": TENANT_ID,
+    "activityId": ACTIVITY_ID,
+    "userId": USER_ID,
+    "tipoCodigo": "LLAMADA",
+    "status": "PENDIENTE",
+    "dueDate": "2026-01-05T10:00:00+00:00",
+    "assignedTo": USER_ID,
+    "assignedToUserId": USER_ID,
+    "autoGenerated": False,
+    "createdAt": "2026-01-01T00:00:00+00:00",
+    "updatedAt": "2026-01-01T00:00:00+00:00",
+}
+
+
+# ── Fixtures ───────────────────────────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def reset_handler_clients():
+    """Drop the module-level clients and caches so each test binds to its own moto backend."""
+    import handler
+
+    def reset():
+        handler._dynamodb = None
+        handler._activities_table = None
+        handler._activities_read_table = None
+        handler._system_table = None
+        handler._TIPO_CODIGO_CACHE.clear()
+
+    reset()
+    yield
+    reset()
+
+
+@pytest.fixture
+def aws_env():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+
+@pytest.fixture
+def setup_aws(aws_env):
+    """Create the Activities and system tables, seeded with one pending activity."""
+    with mock_aws():
+        ddb = boto3.resource("dynamodb", region_name="us-east-1")
+        activities_table = ddb.create_table(**ACTIVITIES_TABLE_DEF)
+        system_table = ddb.create_table(**SYSTEM_TABLE_DEF)
+        for code in SYSTEM_TIPO_CODIGOS:
+            system_table.put_item(Item={"partitionKey": "SYSTEM", "code": code})
+
+        activities_table.put_item(Item={**BASE_ACTIVITY})
+        yield activities_table
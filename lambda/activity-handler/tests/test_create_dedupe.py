@@ -0,0 +1,106 @@
+"""Tests for POST /activities dedupe of auto-generated activities."""
+import json
+import os
+import sys
+import uuid
+
+from conftest import make_event, USER_ID, TENANT_ID
+
+# shared/ sits next to the handler directories in lambda/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+AUTO_BODY = {
+    "tipoCodigo": "LLAMADA",
+    "dueDate": "2026-01-05",
+    "entityType": "CLIENT",
+    "entityId": "cli-1",
+    "autoGenerated": True,
+}
+
+
+def _create(body: dict) -> tuple[int, dict]:
+    import handler
+    result = handler.handler(make_event("POST", "/activities", body=body))
+    return result["statusCode"], json.loads(result["body"])
+
+
+def _keyed_id(composite: str = "CLIENT#cli-1", tipo_codigo: str = "LLAMADA") -> str:
+    import handler
+    return str(uuid.uuid5(handler._AUTO_ACTIVITY_NAMESPACE, f"{composite}|{tipo_codigo}"))
+
+
+class TestCreateDedupeMiss:
+    def test_first_auto_activity_is_created_under_keyed_id(self, setup_aws):
+        status, body = _create(AUTO_BODY)
+        assert status == 201
+        assert body["created"] is True
+        assert body["activity"]["activityId"] == _keyed_id()
+        item = setup_aws.get_item(Key={"tenantId": TENANT_ID, "activityId": _keyed_id()}).get("Item")
+        assert item["status"] == "PENDIENTE"
+
+    def test_manual_activities_are_never_deduplicated(self, setup_aws):
+        body = {**AUTO_BODY, "autoGenerated": False}
+        first_status, first = _create(body)
+        second_status, second = _create(body)
+        assert (first_status, second_status) == (201, 201)
+        assert first["activity"]["activityId"] != second["activity"]["activityId"]
+
+    def test_other_type_on_same_entity_is_created(self, setup_aws):
+        _create(AUTO_BODY)
+        status, body = _create({**AUTO_BODY, "tipoCodigo": "REUNION"})
+        assert status == 201
+        assert body["activity"]["activityId"] == _keyed_id(tipo_codigo="REUNION")
+
+    def test_closed_keyed_activity_is_kept_and_new_one_gets_random_id(self, setup_aws):
+        _, first = _create(AUTO_BODY)
+        setup_aws.update_item(
+            Key={"tenantId": TENANT_ID, "activityId": first["activity"]["activityId"]},
+            UpdateExpression="SET #s = :s",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":s": "HECHA"},
+        )
+
+        status, body = _create(AUTO_BODY)
+
+        assert status == 201
+        new_id = body["activity"]["activityId"]
+        assert new_id != _keyed_id()
+        closed = setup_aws.get_item(Key={"tenantId": TENANT_ID, "activityId": _keyed_id()}).get("Item")
+        assert closed["status"] == "HECHA"
+
+
+class TestCreateDedupeHit:
+    def test_second_auto_activity_returns_existing(self, setup_aws):
+        _, first = _create(AUTO_BODY)
+        status, body = _create(AUTO_BODY)
+        assert status == 200
+        assert body["created"] is False
+        assert body["reason"] == "duplicate_auto_activity"
+        assert body["activity"]["activityId"] == first["activity"]["activityId"]
+
+    def test_pending_row_from_shared_module_is_found_by_query(self, setup_aws, monkeypatch):
+        from shared import auto_activity
+        monkeypatch.setattr(auto_activity, "_dynamodb", None)
+        shared_item = auto_activity.create_auto_activity(
+            "Activities", TENANT_ID, USER_ID, "LLAMADA", "2026-01-05", "CLIENT", "cli-1",
+        )
+
+        status, body = _create(AUTO_BODY)
+
+        assert status == 200
+        assert body["created"] is False
+        assert body["activity"]["activityId"] == shared_item["activityId"]
+        keyed = setup_aws.get_item(Key={"tenantId": TENANT_ID, "activityId": _keyed_id()}).get("Item")
+        assert keyed is None
+
+    def test_racing_create_collides_on_keyed_id(self, setup_aws, monkeypatch):
+        """A concurrent create lands after the pending query: the keyed put fails and returns it."""
+        import handler
+        _, first = _create(AUTO_BODY)
+        monkeypatch.setattr(handler, "_find_pending_auto_activity", lambda *args: None)
+
+        status, body = _create(AUTO_BODY)
+
+        assert status == 200
+        assert body["created"] is False
+        assert body["activity"]["activityId"] == first["activity"]["activityId"]
@@ -0,0 +1,110 @@
+"""Tests for the conditional writes behind complete/cancel/delete/patch and their failure mapping."""
+import json
+
+import pytest
+
+from conftest import (
+    make_event, BASE_ACTIVITY,
+    USER_ID, OTHER_USER_ID, ACTIVITY_ID, TENANT_ID,
+)
+
+
+def _call(event: dict) -> tuple[int, dict]:
+    import handler
+    result = handler.handler(event)
+    return result["statusCode"], json.loads(result["body"])
+
+
+def _complete(activity_id: str = ACTIVITY_ID, user_id: str = USER_ID) -> dict:
+    return make_event(
+        "POST", f"/activities/{activity_id}/complete",
+        body={}, path_params={"activityId": activity_id}, user_id=user_id,
+    )
+
+
+def _cancel(activity_id: str = ACTIVITY_ID, user_id: str = USER_ID) -> dict:
+    return make_event(
+        "POST", f"/activities/{activity_id}/cancel",
+        path_params={"activityId": activity_id}, user_id=user_id,
+    )
+
+
+def _delete(activity_id: str = ACTIVITY_ID, user_id: str = USER_ID) -> dict:
+    return make_event(
+        "DELETE", f"/activities/{activity_id}",
+        path_params={"activityId": activity_id}, user_id=user_id,
+    )
+
+
+def _patch(activity_id: str = ACTIVITY_ID, user_id: str = USER_ID) -> dict:
+    return make_event(
+        "PATCH", f"/activities/{activity_id}",
+        body={"notes": "actualizado"}, path_params={"activityId": activity_id}, user_id=user_id,
+    )
+
+
+ALL_WRITES = [_complete, _cancel, _delete, _patch]
+STATUS_WRITES = [(_complete, "complete"), (_cancel, "cancel")]
+
+
+class TestWriteSucceeds:
+    def test_complete_marks_hecha(self, setup_aws):
+        status, body = _call(_complete())
+        assert status == 200
+        assert body["status"] == "HECHA"
+        assert "completedAt" in body
+
+    def test_cancel_marks_cancelada(self, setup_aws):
+        status, body = _call(_cancel())
+        assert status == 200
+        assert body["status"] == "CANCELADA"
+        assert "cancelledAt" in body
+
+    def test_patch_updates_fields(self, setup_aws):
+        status, body = _call(_patch())
+        assert status == 200
+        assert body["notes"] == "actualizado"
+
+    def test_delete_removes_item(self, setup_aws):
+        status, body = _call(_delete())
+        assert status == 200
+        assert body == {"success": True, "activityId": ACTIVITY_ID}
+        item = setup_aws.get_item(Key={"tenantId": TENANT_ID, "activityId": ACTIVITY_ID}).get("Item")
+        assert item is None
+
+
+class TestWriteRejections:
+    @pytest.mark.parametrize("build", ALL_WRITES, ids=lambda b: b.__name__.strip("_"))
+    def test_missing_activity_returns_404(self, setup_aws, build):
+        status, body = _call(build(activity_id="act-missing"))
+        assert status == 404
+        assert body == {"error": "Activity not found"}
+        # The failed condition must not leave a stub item behind
+        item = setup_aws.get_item(Key={"tenantId": TENANT_ID, "activityId": "act-missing"}).get("Item")
+        assert item is None
+
+    @pytest.mark.parametrize("build", ALL_WRITES, ids=lambda b: b.__name__.strip("_"))
+    def test_foreign_activity_returns_403(self, setup_aws, build):
+        status, body = _call(build(user_id=OTHER_USER_ID))
+        assert status == 403
+        assert body == {"error": "Forbidden"}
+        item = setup_aws.get_item(Key={"tenantId": TENANT_ID, "activityId": ACTIVITY_ID}).get("Item")
+        assert item == BASE_ACTIVITY
+
+    @pytest.mark.parametrize("build,action", STATUS_WRITES, ids=["complete", "cancel"])
+    @pytest.mark.parametrize("closed_status", ["HECHA", "CANCELADA"])
+    def test_closed_activity_returns_400(self, setup_aws, build, action, closed_status):
+        setup_aws.put_item(Item={**BASE_ACTIVITY, "status": closed_status})
+        status, body = _call(build())
+        assert status == 400
+        assert body == {
+            "error": f"Cannot {action} an activity that is already {closed_status}",
+            "status": closed_status,
+        }
+
+    def test_condition_failure_on_owned_pending_item_returns_409(self, setup_aws):
+        """The item matched the condition again by the time it was read back: a concurrent write."""
+        import handler
+        result = handler._rejected_write(USER_ID, ACTIVITY_ID, "complete")
+        assert result["statusCode"] == 409
+        assert json.loads(result["body"]) == {"error": "Activity was modified concurrently"}
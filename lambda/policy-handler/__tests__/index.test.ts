@@ -213,6 +213,41 @@ describe('Policy Handler Lambda', () => {
       expect(result.statusCode).toBe(200);
     });
 
+    it('should remove fechaRenovacion instead of setting it to null', async () => {
+      const userId = 'user-123';
+      const policyId = 'policy-1';
+      const mockPolicy = {
+        policyId,
+        userId,
+        tipoPoliza: 'Auto',
+        fechaInicio: '2024-01-01',
+        fechaRenovacion: '2025-01-01',
+      };
+
+      dynamoMock.on(GetItemCommand).resolves({
+        Item: marshall(mockPolicy),
+      });
+
+      dynamoMock.on(UpdateItemCommand).resolves({
+        Attributes: marshall({
+          policyId,
+          userId,
+          tipoPoliza: 'Vida permanente',
+          fechaInicio: '2024-01-01',
+          updatedAt: '2024-01-02T00:00:00Z',
+        }),
+      });
+
+      const updates = { tipoPoliza: 'Vida permanente' };
+      const event = mockEvent('PUT', `/policies/${policyId}`, userId, updates, { id: policyId });
+      const result = await handler(event as any);
+
+      expect(result.statusCode).toBe(200);
+      const input = dynamoMock.commandCalls(UpdateItemCommand)[0].args[0].input;
+      expect(input.UpdateExpression).toContain('REMOVE #fechaRenovacion');
+      expect(input.ExpressionAttributeValues).not.toHaveProperty(':fechaRenovacion');
+    });
+
     it('should return 403 when updating another user policy', async () => {
       const mockPolicy = {
         policyId: 'policy-1',
@@ -226,6 +226,7 @@ async function updatePolicy(userId: string, policyId: string, updates: any): Pro
 
   // Build update expression
   const updateExpressions: string[] = [];
+  const removeExpressions: string[] = [];
   const expressionAttributeNames: { [key: string]: string } = {};
   const expressionAttributeValues: { [key: string]: any } = {};
 
@@ -244,6 +245,12 @@ async function updatePolicy(userId: string, policyId: string, updates: any): Pro
 
   allowedFields.forEach(field => {
     if (updates[field] !== undefined) {
+      // fechaRenovacion keys the renewals GSI, which rejects nulls; drop it instead
+      if (field === 'fechaRenovacion' && updates[field] === null) {
+        removeExpressions.push(`#${field}`);
+        expressionAttributeNames[`#${field}`] = field;
+        return;
+      }
       updateExpressions.push(`#${field} = :${field}`);
       expressionAttributeNames[`#${field}`] = field;
       expressionAttributeValues[`:${field}`] = updates[field];
@@ -258,7 +265,8 @@ async function updatePolicy(userId: string, policyId: string, updates: any): Pro
   const updateCommand = new UpdateItemCommand({
     TableName: POLICIES_TABLE,
     Key: marshall({ policyId }),
-    UpdateExpression: `SET ${updateExpressions.join(', ')}`,
+    UpdateExpression: `SET ${updateExpressions.join(', ')}` +
+      (removeExpressions.length ? ` REMOVE ${removeExpressions.join(', ')}` : ''),
     ExpressionAttributeNames: expressionAttributeNames,
     ExpressionAttributeValues: marshall(expressionAttributeValues),
     ReturnValues: 'ALL_NEW',
@@ -118,6 +118,7 @@ if ($LASTEXITCODE -eq 0) {
         $updateResult = & $awsCmd lambda update-function-code `
             --function-name $FunctionName `
             --zip-file "fileb://$zipFile" `
+            --architectures arm64 `
             --region $Region `
             --output json 2>&1
         
@@ -180,6 +181,7 @@ if ($LASTEXITCODE -eq 0) {
     Write-ErrorMsg "Please create the Lambda function first using the AWS Console or CloudFormation"
     Write-InfoMsg "The function should be created with:"
     Write-InfoMsg "  - Runtime: Python 3.x"
+    Write-InfoMsg "  - Architecture: arm64"
     Write-InfoMsg "  - Handler: profile_handler.lambda_handler"
     Write-InfoMsg "  - Environment variables: DYNAMODB_USERS_TABLE, S3_BUCKET_NAME"
     Write-InfoMsg "  - IAM role with DynamoDB and S3 permissions"
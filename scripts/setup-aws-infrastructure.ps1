@@ -142,9 +142,9 @@ try {
 try {
     aws dynamodb create-table `
         --table-name $POLICIES_TABLE `
-        --attribute-definitions AttributeName=policyId,AttributeType=S AttributeName=userId,AttributeType=S AttributeName=createdAt,AttributeType=S `
+        --attribute-definitions AttributeName=policyId,AttributeType=S AttributeName=userId,AttributeType=S AttributeName=createdAt,AttributeType=S AttributeName=fechaRenovacion,AttributeType=S `
         --key-schema AttributeName=policyId,KeyType=HASH `
-        --global-secondary-indexes "IndexName=userId-index,KeySchema=[{AttributeName=userId,KeyType=HASH},{AttributeName=createdAt,KeyType=RANGE}],Projection={ProjectionType=ALL}" `
+        --global-secondary-indexes "IndexName=userId-index,KeySchema=[{AttributeName=userId,KeyType=HASH},{AttributeName=createdAt,KeyType=RANGE}],Projection={ProjectionType=ALL}" "IndexName=userId-fechaRenovacion-index,KeySchema=[{AttributeName=userId,KeyType=HASH},{AttributeName=fechaRenovacion,KeyType=RANGE}],Projection={ProjectionType=ALL}" `
         --billing-mode PAY_PER_REQUEST `
         --region $AWS_REGION 2>$null | Out-Null
     Write-Host "✓ Policies table created" -ForegroundColor Green
@@ -157,6 +157,40 @@ Write-Host "Waiting for tables to become active..." -ForegroundColor Yellow
 aws dynamodb wait table-exists --table-name $USERS_TABLE --region $AWS_REGION
 aws dynamodb wait table-exists --table-name $POLICIES_TABLE --region $AWS_REGION
 Write-Host "✓ Tables are active" -ForegroundColor Green
+
+# Add the renewals index to Policies tables created before it existed.
+# GET /policies/renewals queries it, so it must be ACTIVE before that handler is deployed
+$RENEWALS_INDEX = "userId-fechaRenovacion-index"
+$renewalsIndexCount = aws dynamodb describe-table `
+    --table-name $POLICIES_TABLE `
+    --region $AWS_REGION `
+    --query "length(Table.GlobalSecondaryIndexes[?IndexName=='$RENEWALS_INDEX'] || ``[]``)" `
+    --output text
+
+if ($renewalsIndexCount -eq "0") {
+    Write-Host "Adding $RENEWALS_INDEX to existing Policies table..." -ForegroundColor Yellow
+    $renewalsIndexUpdate = '[{"Create":{"IndexName":"userId-fechaRenovacion-index","KeySchema":[{"AttributeName":"userId","KeyType":"HASH"},{"AttributeName":"fechaRenovacion","KeyType":"RANGE"}],"Projection":{"ProjectionType":"ALL"}}}]'
+    $renewalsIndexFile = [System.IO.Path]::GetTempFileName()
+    Set-Content -Path $renewalsIndexFile -Value $renewalsIndexUpdate -Encoding ASCII
+    aws dynamodb update-table `
+        --table-name $POLICIES_TABLE `
+        --attribute-definitions AttributeName=userId,AttributeType=S AttributeName=fechaRenovacion,AttributeType=S `
+        --global-secondary-index-updates "file://$renewalsIndexFile" `
+        --region $AWS_REGION | Out-Null
+    Remove-Item $renewalsIndexFile
+}
+
+# Backfilling the index can take a while on large tables
+Write-Host "Waiting for $RENEWALS_INDEX to become active..." -ForegroundColor Yellow
+do {
+    Start-Sleep -Seconds 10
+    $renewalsIndexStatus = aws dynamodb describe-table `
+        --table-name $POLICIES_TABLE `
+        --region $AWS_REGION `
+        --query "Table.GlobalSecondaryIndexes[?IndexName=='$RENEWALS_INDEX'].IndexStatus | [0]" `
+        --output text
+} while ($renewalsIndexStatus -ne "ACTIVE")
+Write-Host "✓ $RENEWALS_INDEX is active" -ForegroundColor Green
 Write-Host ""
 
 # ============================================
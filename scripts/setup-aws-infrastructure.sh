@@ -154,9 +154,11 @@ aws dynamodb create-table \
         AttributeName=policyId,AttributeType=S \
         AttributeName=userId,AttributeType=S \
         AttributeName=createdAt,AttributeType=S \
+        AttributeName=fechaRenovacion,AttributeType=S \
     --key-schema AttributeName=policyId,KeyType=HASH \
     --global-secondary-indexes \
         "IndexName=userId-index,KeySchema=[{AttributeName=userId,KeyType=HASH},{AttributeName=createdAt,KeyType=RANGE}],Projection={ProjectionType=ALL}" \
+        "IndexName=userId-fechaRenovacion-index,KeySchema=[{AttributeName=userId,KeyType=HASH},{AttributeName=fechaRenovacion,KeyType=RANGE}],Projection={ProjectionType=ALL}" \
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" \
     &> /dev/null || echo -e "${YELLOW}Policies table may already exist${NC}"
@@ -168,6 +170,39 @@ echo -e "${YELLOW}Waiting for tables to become active...${NC}"
 aws dynamodb wait table-exists --table-name "${USERS_TABLE}" --region "${AWS_REGION}"
 aws dynamodb wait table-exists --table-name "${POLICIES_TABLE}" --region "${AWS_REGION}"
 echo -e "${GREEN}✓ Tables are active${NC}"
+
+# Add the renewals index to Policies tables created before it existed.
+# GET /policies/renewals queries it, so it must be ACTIVE before that handler is deployed
+RENEWALS_INDEX="userId-fechaRenovacion-index"
+RENEWALS_INDEX_COUNT=$(aws dynamodb describe-table \
+    --table-name "${POLICIES_TABLE}" \
+    --region "${AWS_REGION}" \
+    --query "length(Table.GlobalSecondaryIndexes[?IndexName=='${RENEWALS_INDEX}'] || \`[]\`)" \
+    --output text)
+
+if [ "${RENEWALS_INDEX_COUNT}" = "0" ]; then
+    echo -e "${YELLOW}Adding ${RENEWALS_INDEX} to existing Policies table...${NC}"
+    aws dynamodb update-table \
+        --table-name "${POLICIES_TABLE}" \
+        --attribute-definitions \
+            AttributeName=userId,AttributeType=S \
+            AttributeName=fechaRenovacion,AttributeType=S \
+        --global-secondary-index-updates \
+            '[{"Create":{"IndexName":"userId-fechaRenovacion-index","KeySchema":[{"AttributeName":"userId","KeyType":"HASH"},{"AttributeName":"fechaRenovacion","KeyType":"RANGE"}],"Projection":{"ProjectionType":"ALL"}}}]' \
+        --region "${AWS_REGION}" \
+        > /dev/null
+fi
+
+# Backfilling the index can take a while on large tables
+echo -e "${YELLOW}Waiting for ${RENEWALS_INDEX} to become active...${NC}"
+until [ "$(aws dynamodb describe-table \
+    --table-name "${POLICIES_TABLE}" \
+    --region "${AWS_REGION}" \
+    --query "Table.GlobalSecondaryIndexes[?IndexName=='${RENEWALS_INDEX}'].IndexStatus | [0]" \
+    --output text)" = "ACTIVE" ]; do
+    sleep 10
+done
+echo -e "${GREEN}✓ ${RENEWALS_INDEX} is active${NC}"
 echo ""
 
 # ============================================